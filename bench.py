@@ -0,0 +1,270 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from lib import circuit
+from lib.circuit import Circuit
+from lib.engine import evaluate_packed, pack, unpack
+from lib.lut import load_lut
+from lib.netlist import contact_names
+from lib.utils import CircuitError, Display
+
+SIM_CLASSES = ("XOR", "ADD", "ADD8", "GT8", "EQ8", "ALU")
+
+
+def circuit_classes():
+    return [
+        cls for cls in vars(circuit).values()
+        if isinstance(cls, type) and issubclass(cls, Circuit) and cls.__module__ == circuit.__name__ and cls is not Circuit
+    ]
+
+
+def census(c):
+    circuits = 0
+    stack = [c]
+    while stack:
+        e = stack.pop()
+        circuits += 1
+        stack.extend(e._elements)
+    prims = c.primitives()
+    contacts = sum(len(p._input_names) + len(p._output_names) for p in prims)
+    conductors = len(c.conductors())
+    return {
+        "circuits": circuits,
+        "primitives": len(prims),
+        "contacts": contacts,
+        "conductors": conductors,
+        "objects": circuits + contacts + conductors,
+    }
+
+
+def bench_build(cls, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cls()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    c = cls()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    res = {
+        "class": cls.__name__,
+        "build_min_s": min(times),
+        "build_mean_s": sum(times) / len(times),
+        "peak_bytes": peak,
+        "retained_bytes": retained,
+    }
+    res.update(census(c))
+    res.update(bench_state(cls, repeat))
+    return res
+
+
+def bench_state(cls, repeat):
+    try:
+        cls.topology()
+    except CircuitError:
+        return {"state_build_min_s": None, "state_bytes": None, "state_nets": None}
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cls.state()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    state = cls.state()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {"state_build_min_s": min(times), "state_bytes": retained, "state_nets": len(state.values)}
+
+
+def stimulus(cls, count, seed):
+    width = len(contact_names(cls(), "in"))
+    rng = random.Random(f"{seed}:{cls.__name__}")
+    return [tuple(rng.randint(0, 1) for _ in range(width)) for _ in range(count)]
+
+
+def warm_up(cls):
+    cls.netlist()
+    return cls.DEPTH
+
+
+def graph_engine(**run_kwargs):
+    def engine(cls, vectors):
+        warm_up(cls)
+        width = len(contact_names(cls(), "out"))
+        latencies = []
+        ticks = []
+        for v in vectors:
+            start = time.perf_counter()
+            d = Display(width)
+            kwargs = {f"in{i + 1}": b for i, b in enumerate(v)}
+            kwargs.update({f"out{i + 1}": getattr(d, f"c{i + 1}") for i in range(width)})
+            ticks.append(cls(**kwargs).run(**run_kwargs))
+            latencies.append(time.perf_counter() - start)
+        return latencies, ticks if run_kwargs.get("settle") else None
+    return engine
+
+
+def reuse_engine(cls, vectors):
+    warm_up(cls)
+    c = cls()
+    latencies = []
+    for v in vectors:
+        start = time.perf_counter()
+        c.set_inputs(**{f"in{i + 1}": b for i, b in enumerate(v)})
+        c.run(event=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies, None
+
+
+def state_engine(cls, vectors):
+    s = cls.state()
+    latencies = []
+    for v in vectors:
+        start = time.perf_counter()
+        s.set_inputs(**{f"in{i + 1}": b for i, b in enumerate(v)})
+        s.run()
+        latencies.append(time.perf_counter() - start)
+    return latencies, None
+
+
+def compiled_engine(cls, vectors):
+    f = cls.compile()
+    latencies = []
+    for v in vectors:
+        start = time.perf_counter()
+        f(*v)
+        latencies.append(time.perf_counter() - start)
+    return latencies, None
+
+
+def packed_engine(cls, vectors):
+    start = time.perf_counter()
+    unpack(evaluate_packed(cls.netlist(), pack(vectors), len(vectors)), len(vectors))
+    return time.perf_counter() - start, None
+
+
+def numpy_engine(cls, vectors):
+    import numpy
+
+    array = numpy.array(vectors, dtype=numpy.uint8)
+    start = time.perf_counter()
+    cls.evaluate_batch(array)
+    return time.perf_counter() - start, None
+
+
+def lut_engine(cls, vectors):
+    latencies = []
+    with tempfile.TemporaryDirectory() as d:
+        with load_lut(cls, d) as lut:
+            for v in vectors:
+                start = time.perf_counter()
+                lut.lookup(*v)
+                latencies.append(time.perf_counter() - start)
+    return latencies, None
+
+
+ENGINES = {
+    "tick": graph_engine(),
+    "settle": graph_engine(settle=True),
+    "event": graph_engine(event=True),
+    "levelized": graph_engine(levelized=True),
+    "reuse": reuse_engine,
+    "state": state_engine,
+    "compiled": compiled_engine,
+    "packed": packed_engine,
+    "numpy": numpy_engine,
+    "lut": lut_engine,
+}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def bench_sim(cls, engine, vectors):
+    res = {"class": cls.__name__, "engine": engine, "vectors": len(vectors)}
+    try:
+        if not cls.ELEMENTS:
+            raise CircuitError("Empty scheme")
+        latencies, ticks = ENGINES[engine](cls, vectors)
+    except (CircuitError, ImportError) as e:
+        res["error"] = f"{type(e).__name__}: {e}"
+        return res
+    if isinstance(latencies, list):
+        total = sum(latencies)
+        res.update({f"p{p}_s": percentile(latencies, p) for p in (50, 90, 99)})
+    else:
+        total = latencies
+    res["total_s"] = total
+    res["vectors_per_s"] = len(vectors) / total if total else None
+    if ticks:
+        res["settle_ticks_mean"] = sum(ticks) / len(ticks)
+        res["settle_ticks_max"] = max(ticks)
+    return res
+
+
+def run_build(classes, args):
+    return [bench_build(cls, args.repeat) for cls in classes]
+
+
+def run_sim(classes, args):
+    results = []
+    for cls in classes:
+        vectors = stimulus(cls, args.vectors, args.seed)
+        for engine in args.engines or ENGINES:
+            results.append(bench_sim(cls, engine, vectors))
+    return results
+
+
+SUITES = {
+    "build": run_build,
+    "sim": run_sim,
+}
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Circuit benchmarks")
+    parser.add_argument("suite", choices=tuple(SUITES))
+    parser.add_argument("--repeat", type=int, default=20, help="build: constructions per class")
+    parser.add_argument("--vectors", type=int, default=50, help="sim: stimulus vectors per class")
+    parser.add_argument("--seed", type=int, default=0, help="sim: stimulus seed")
+    parser.add_argument("--engines", nargs="*", choices=tuple(ENGINES), help="sim: engines to run")
+    parser.add_argument("--only", nargs="*", help="class names to benchmark")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+    classes = circuit_classes()
+    if args.only:
+        classes = [cls for cls in classes if cls.__name__ in args.only]
+    elif args.suite == "sim":
+        classes = [cls for cls in classes if cls.__name__ in SIM_CLASSES]
+    report = {
+        "suite": args.suite,
+        "environment": environment(),
+        "options": {"repeat": args.repeat, "vectors": args.vectors, "seed": args.seed},
+        "results": SUITES[args.suite](classes, args),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
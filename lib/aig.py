@@ -0,0 +1,192 @@
+import heapq
+
+from lib.netlist import Netlist
+
+FALSE = 0
+TRUE = 1
+
+
+class AIG:
+    def __init__(self, name, inputs):
+        self.name = name
+        self.nodes = [None]
+        self.levels = [0]
+        self.inputs = []
+        for _ in range(inputs):
+            self.inputs.append(2 * len(self.nodes))
+            self.nodes.append(None)
+            self.levels.append(0)
+        self.outputs = []
+        self.table = {}
+
+    def __len__(self):
+        return len(self.nodes) - len(self.inputs) - 1
+
+    def __repr__(self):
+        return f"<AIG {self.name}: {len(self.inputs)} in, {len(self.outputs)} out, {len(self)} ands, depth {self.depth()}>"
+
+    def children(self, lit):
+        return self.nodes[lit >> 1]
+
+    def level(self, lit):
+        return self.levels[lit >> 1]
+
+    def depth(self):
+        return max([self.level(o) for o in self.outputs], default=0)
+
+    def and_(self, a, b):
+        if a > b:
+            a, b = b, a
+        if a == FALSE:
+            return FALSE
+        if a == TRUE or a == b:
+            return b
+        if a == b ^ 1:
+            return FALSE
+        for x, y in ((a, b), (b, a)):
+            n = self.children(y)
+            if n is None:
+                continue
+            c, d = n
+            if not y & 1:
+                if x in n:
+                    return y
+                if x ^ 1 in n:
+                    return FALSE
+            else:
+                if x ^ 1 in n:
+                    return x
+                if x == c:
+                    return self.and_(x, d ^ 1)
+                if x == d:
+                    return self.and_(x, c ^ 1)
+        key = (a, b)
+        if key not in self.table:
+            self.table[key] = 2 * len(self.nodes)
+            self.nodes.append(key)
+            self.levels.append(max(self.level(a), self.level(b)) + 1)
+        return self.table[key]
+
+    def or_(self, a, b):
+        return self.and_(a ^ 1, b ^ 1) ^ 1
+
+    def reachable(self):
+        seen = set()
+        stack = [o >> 1 for o in self.outputs]
+        while stack:
+            n = stack.pop()
+            if n in seen:
+                continue
+            seen.add(n)
+            if self.nodes[n] is not None:
+                stack.extend(x >> 1 for x in self.nodes[n])
+        return sorted(seen)
+
+    def _copy(self):
+        new = AIG(self.name, len(self.inputs))
+        mapping = {0: FALSE}
+        for old, lit in zip(self.inputs, new.inputs):
+            mapping[old >> 1] = lit
+        return new, mapping
+
+    def rewrite(self):
+        new, mapping = self._copy()
+        for n in self.reachable():
+            if self.nodes[n] is not None:
+                a, b = self.nodes[n]
+                mapping[n] = new.and_(mapping[a >> 1] ^ (a & 1), mapping[b >> 1] ^ (b & 1))
+        new.outputs = [mapping[o >> 1] ^ (o & 1) for o in self.outputs]
+        return new
+
+    def balance(self):
+        nodes = [n for n in self.reachable() if self.nodes[n] is not None]
+        fanout = {}
+        for n in nodes:
+            for x in self.nodes[n]:
+                fanout[x >> 1] = fanout.get(x >> 1, 0) + 1
+        for o in self.outputs:
+            fanout[o >> 1] = fanout.get(o >> 1, 0) + 1
+        absorbed = set()
+        for n in nodes:
+            for x in self.nodes[n]:
+                if not x & 1 and self.nodes[x >> 1] is not None and fanout[x >> 1] == 1:
+                    absorbed.add(x >> 1)
+        new, mapping = self._copy()
+        for n in nodes:
+            if n in absorbed:
+                continue
+            leaves = []
+            stack = list(self.nodes[n])
+            while stack:
+                x = stack.pop()
+                if x >> 1 in absorbed and not x & 1:
+                    stack.extend(self.nodes[x >> 1])
+                else:
+                    leaves.append(mapping[x >> 1] ^ (x & 1))
+            heap = [(new.level(x), x) for x in leaves]
+            heapq.heapify(heap)
+            while len(heap) > 1:
+                a = heapq.heappop(heap)[1]
+                b = heapq.heappop(heap)[1]
+                x = new.and_(a, b)
+                heapq.heappush(heap, (new.level(x), x))
+            mapping[n] = heap[0][1]
+        new.outputs = [mapping[o >> 1] ^ (o & 1) for o in self.outputs]
+        return new.rewrite()
+
+    def to_netlist(self):
+        net = {}
+        gates = []
+        for i, lit in enumerate(self.inputs):
+            net[lit] = i
+        size = len(self.inputs)
+
+        def literal(x):
+            nonlocal size
+            if x in net:
+                return net[x]
+            if x >> 1 == 0:
+                if FALSE not in net:
+                    net[FALSE] = size
+                    gates.append(("zero", size, ()))
+                    size += 1
+                if x == FALSE:
+                    return net[FALSE]
+            net[x] = size
+            gates.append(("not", size, (net[x ^ 1],)))
+            size += 1
+            return net[x]
+
+        for n in self.reachable():
+            if self.nodes[n] is not None:
+                a, b = self.nodes[n]
+                ins = (literal(a), literal(b))
+                net[2 * n] = size
+                gates.append(("and", size, ins))
+                size += 1
+        outputs = [literal(o) for o in self.outputs]
+        return Netlist(self.name, list(range(len(self.inputs))), outputs, gates, size)
+
+
+def from_netlist(netlist):
+    aig = AIG(netlist.name, len(netlist.inputs))
+    lit = {}
+    for n, x in zip(netlist.inputs, aig.inputs):
+        lit[n] = x
+    for op, out, ins in netlist.ordered():
+        if op == "not":
+            lit[out] = lit[ins[0]] ^ 1
+        elif op == "and":
+            x = TRUE
+            for i in ins:
+                x = aig.and_(x, lit[i])
+            lit[out] = x
+        elif op == "or":
+            x = FALSE
+            for i in ins:
+                x = aig.or_(x, lit[i])
+            lit[out] = x
+        else:
+            lit[out] = FALSE
+    aig.outputs = [lit[n] for n in netlist.outputs]
+    return aig
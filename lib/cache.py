@@ -0,0 +1,106 @@
+import hashlib
+import inspect
+import json
+import os
+
+from lib import core, netlist, optimize as passes
+from lib.netlist import Netlist, flatten
+from lib.optimize import optimize
+from lib.utils import CircuitError
+
+
+class _Probe:
+    def __init__(self, path):
+        self.path = path
+
+    def __getattr__(self, name):
+        return _Probe(f"{self.path}.{name}" if self.path else name)
+
+
+def _label(contact):
+    return contact.path if contact is not None else ""
+
+
+def structural_hash(cls, _memo=None):
+    memo = {} if _memo is None else _memo
+    if cls not in memo:
+        probe = _Probe("")
+        parts = [cls.__name__, str(cls.GATE)]
+        for elem, names in cls.ELEMENTS.items():
+            parts.append(f"{structural_hash(elem, memo)}:{','.join(names)}")
+        for name, contact in cls.inout(probe).items():
+            parts.append(f"{name}={_label(contact)}")
+        for c in cls.connect(probe):
+            parts.append("-".join(_label(x) for x in c))
+        if cls.GATE is not None:
+            parts.append(inspect.getsource(cls.evaluate))
+        if _memo is None:
+            parts.append(inspect.getsource(core))
+            parts.append(inspect.getsource(netlist))
+            parts.append(inspect.getsource(passes))
+        memo[cls] = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+    return memo[cls]
+
+
+def cache_dir():
+    return os.environ.get("ALU_CACHE")
+
+
+def _dump(nl):
+    return json.dumps({
+        "name": nl.name,
+        "inputs": nl.inputs,
+        "outputs": nl.outputs,
+        "gates": nl.gates,
+        "size": nl.size,
+        "order": nl._order,
+    })
+
+
+def _load(data):
+    data = json.loads(data)
+    nl = Netlist(data["name"], list(data["inputs"]), list(data["outputs"]), _gates(data["gates"]), int(data["size"]))
+    if data["order"] is not None:
+        nl._order = _gates(data["order"])
+    return nl
+
+
+def _gates(gates):
+    return [(str(op), int(out), tuple(int(i) for i in ins)) for op, out, ins in gates]
+
+
+def prune(directory, name, keep, suffix):
+    for entry in os.listdir(directory):
+        if entry != keep and entry.startswith(f"{name}-") and entry.endswith(suffix):
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass
+
+
+def load_netlist(cls, directory=None):
+    directory = directory or cache_dir()
+    if not directory:
+        return optimize(flatten(cls))
+    name = f"{cls.__name__}-{structural_hash(cls)[:16]}.netlist"
+    path = os.path.join(directory, name)
+    try:
+        with open(path, "rb") as f:
+            return _load(f.read())
+    except Exception:
+        pass
+    nl = optimize(flatten(cls))
+    try:
+        nl.ordered()
+    except CircuitError:
+        pass
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}"
+        with open(tmp, "w") as f:
+            f.write(_dump(nl))
+        os.replace(tmp, path)
+        prune(directory, cls.__name__, name, ".netlist")
+    except OSError:
+        pass
+    return nl
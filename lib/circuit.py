@@ -1,12 +1,47 @@
-from lib.core import C, Input, Output
+from collections import OrderedDict, deque
+
+from lib.core import C, Contact, Input, Output
+from lib.aig import from_netlist
+from lib.cache import load_netlist
+from lib.codegen import compile_netlist
+from lib.engine import evaluate, evaluate_array
+from lib.netlist import contact_names
+from lib.state import State, Topology
 from lib.utils import CircuitError
 
 
+MSB8 = (128, 64, 32, 16, 8, 4, 2, 1)
+LSB9 = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+BIT = (1,)
+
+_BITS = {}
+
+
+def bit_table(width):
+    if width not in _BITS:
+        _BITS[width] = tuple(
+            tuple((v >> (width - 1 - k)) & 1 for k in range(width)) for v in range(1 << width)
+        )
+    return _BITS[width]
+
+
+class _Depth:
+    def __get__(self, obj, cls):
+        if "_depth" not in cls.__dict__:
+            cls._depth = cls.logic_depth()
+        return cls._depth
+
+
 class Circuit:
     ELEMENTS = {}
+    GATE = None
+    DEPTH = _Depth()
+    OPERANDS = ()
+    RESULT = ()
+    _memo = None
 
     def __init__(self, **kwargs):
-        self._init = kwargs
+        self._init = {}
         self._elements = []
         for elem, names in self.ELEMENTS.items():
             for n in names:
@@ -14,6 +49,7 @@ class Circuit:
                 self._elements.append(e)
                 setattr(self, n, e)
         self._input_names = []
+        self._output_names = []
         for name, contact in self.inout().items():
             if not (name.startswith('in') or name.startswith('out')):
                 raise CircuitError("Bad contacts name")
@@ -24,9 +60,31 @@ class Circuit:
                 self._input_names.append(name)
             else:
                 setattr(self, name, Output())
+                self._output_names.append(name)
         self._conductors = []
         for c in self.connect():
             self._conductors.append(C(*c))
+        self._events = None
+        self._settled = False
+        if kwargs:
+            self.set_inputs(**kwargs)
+
+    def set_inputs(self, **kwargs):
+        for name, value in kwargs.items():
+            if not isinstance(getattr(self, name, None), Contact):
+                raise CircuitError("Bad contacts name")
+            if name.startswith("out") and not hasattr(value, "value"):
+                raise CircuitError("Bad output sink")
+        self._init.update(kwargs)
+
+    def reset(self):
+        self._settled = False
+        prims, owner, feeds, sinks, conductors = self._event_index()
+        for c in conductors:
+            c.value = 0
+        for p in prims:
+            for name in p._input_names + p._output_names:
+                getattr(p, name).value = 0
 
     def inout(self):
         return {}
@@ -35,6 +93,7 @@ class Circuit:
         return ()
 
     def update(self):
+        self._settled = False
         for n, value in self._init.items():
             c = getattr(self, n)
             if n.startswith('in'):
@@ -47,37 +106,301 @@ class Circuit:
             c.update()
         for n in self._input_names:
             getattr(self, n).update()
-
-    def run(self, n=100):
+        self.evaluate()
+
+    def evaluate(self):
+        pass
+
+    @classmethod
+    def logic_depth(cls):
+        c = cls()
+        prims, owner, feeds, sinks, conductors = c._event_index()
+        succ = {p: [] for p in prims}
+        indegree = dict.fromkeys(prims, 0)
+        for p in prims:
+            for name in p._output_names:
+                for k in feeds.get(getattr(p, name), ()):
+                    for i in sinks.get(k, ()):
+                        succ[p].append(owner[i])
+                        indegree[owner[i]] += 1
+        order = [p for p in prims if not indegree[p]]
+        for p in order:
+            for q in succ[p]:
+                indegree[q] -= 1
+                if not indegree[q]:
+                    order.append(q)
+        if len(order) < len(prims):
+            return None
+        dist = {}
+        for p in reversed(order):
+            dist[p] = max([dist[q] for q in succ[p]], default=0) + 1
+        return max(dist.values(), default=0)
+
+    @classmethod
+    def netlist(cls):
+        if "_netlist" not in cls.__dict__:
+            cls._netlist = load_netlist(cls)
+        return cls._netlist
+
+    @classmethod
+    def aig(cls):
+        if "_aig" not in cls.__dict__:
+            cls._aig = from_netlist(cls.netlist()).balance()
+        return cls._aig
+
+    @classmethod
+    def compile(cls):
+        if "_compiled" not in cls.__dict__:
+            cls._compiled = compile_netlist(cls.netlist(), cls.__name__)
+        return cls._compiled
+
+    @classmethod
+    def topology(cls):
+        if "_topology" not in cls.__dict__:
+            cls._topology = Topology(cls.netlist())
+        return cls._topology
+
+    @classmethod
+    def state(cls, **kwargs):
+        return State(cls.topology(), **kwargs)
+
+    @classmethod
+    def bits(cls, *operands):
+        if not cls.OPERANDS:
+            raise CircuitError("No integer operands")
+        if len(operands) != len(cls.OPERANDS):
+            raise CircuitError("Bad operands")
+        res = ()
+        for width, value in zip(cls.OPERANDS, operands):
+            table = bit_table(width)
+            if not 0 <= value < len(table):
+                raise CircuitError("Operand out of range")
+            res += table[value]
+        return res
+
+    @classmethod
+    def weights(cls, *operands):
+        return cls.RESULT
+
+    @classmethod
+    def compute(cls, *operands):
+        bits = cls.bits(*operands)
+        weights = cls.weights(*operands)
+        res = cls.compile()(*bits)
+        return sum([w for w, bit in zip(weights, res) if bit])
+
+    @classmethod
+    def evaluate_batch(cls, inputs):
+        return evaluate_array(cls.netlist(), inputs)
+
+    def primitives(self):
+        if not self._elements:
+            return [self]
+        res = []
+        for e in self._elements:
+            res.extend(e.primitives())
+        return res
+
+    def conductors(self):
+        res = list(self._conductors)
+        for e in self._elements:
+            res.extend(e.conductors())
+        return res
+
+    def _event_index(self):
+        if self._events is None:
+            prims = self.primitives()
+            owner = {}
+            for p in prims:
+                for n in p._input_names:
+                    owner[getattr(p, n)] = p
+            sinks = {}
+            feeds = {}
+            conductors = self.conductors()
+            for c in conductors:
+                for o in c.contacts:
+                    feeds.setdefault(o, []).append(c)
+            for contact, p in owner.items():
+                for c in contact.conductors:
+                    sinks.setdefault(c, []).append(contact)
+            self._events = (prims, owner, feeds, sinks, conductors)
+        return self._events
+
+    def _run_events(self, n):
+        prims, owner, feeds, sinks, conductors = self._event_index()
+        if self._settled:
+            queue = deque()
+        else:
+            for c in conductors:
+                c.update()
+            for i in owner:
+                i.update()
+            queue = deque(prims)
+        queued = set(queue)
+        outputs = []
+        for name, value in self._init.items():
+            c = getattr(self, name)
+            if not name.startswith('in'):
+                outputs.append((c, value))
+            elif c.value != value:
+                c.value = value
+                p = owner.get(c)
+                if p is not None and p not in queued:
+                    queue.append(p)
+                    queued.add(p)
+        self._settled = False
+        budget = n * len(prims)
+        count = 0
+        while queue:
+            if count >= budget:
+                raise CircuitError("Circuit does not settle")
+            p = queue.popleft()
+            queued.discard(p)
+            count += 1
+            before = [getattr(p, name).value for name in p._output_names]
+            p.evaluate()
+            for name, old in zip(p._output_names, before):
+                o = getattr(p, name)
+                if o.value == old:
+                    continue
+                for c in feeds.get(o, ()):
+                    value = c.value
+                    c.update()
+                    if value == c.value:
+                        continue
+                    for i in sinks.get(c, ()):
+                        value = i.value
+                        i.update()
+                        if value == i.value:
+                            continue
+                        q = owner[i]
+                        if q not in queued:
+                            queue.append(q)
+                            queued.add(q)
+        for c, sink in outputs:
+            sink.value = c.value
+        self._settled = True
+        return count
+
+    def _state(self):
+        prims, owner, feeds, sinks, conductors = self._event_index()
+        res = [c.value for c in conductors]
+        for p in prims:
+            for name in p._input_names + p._output_names:
+                res.append(getattr(p, name).value)
+        return res
+
+    def _run_settle(self, n):
+        state = self._state()
+        for tick in range(1, n + 1):
+            self.update()
+            new = self._state()
+            if new == state:
+                return tick
+            state = new
+        raise CircuitError("Circuit does not settle")
+
+    def _run_levelized(self, n):
+        # Like the plain tick run this reports nothing, also when a cycle forces the event engine.
+        self._settled = False
+        nl = self.netlist()
+        try:
+            nl.ordered()
+        except CircuitError:
+            self._run_events(n)
+            return
+        bits = [self._init.get(name, 0) for name in contact_names(self, "in")]
+        self._set_outputs(contact_names(self, "out"), evaluate(nl, bits))
+
+    def _set_outputs(self, names, values):
+        for name, value in zip(names, values):
+            getattr(self, name).value = value
+            if name in self._init:
+                self._init[name].value = value
+
+    def memoize(self, size=1024):
+        if size < 0:
+            raise CircuitError("Bad cache size")
+        if size and self.DEPTH is None:
+            raise CircuitError("Cannot memoize a cyclic circuit")
+        if not size:
+            self._memo = None
+            return
+        self._memo = OrderedDict()
+        self._memo_size = size
+        self._memo_names = (contact_names(self, "in"), contact_names(self, "out"))
+        self._memo_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def memo_info(self):
+        if self._memo is None:
+            return None
+        return dict(self._memo_stats, size=len(self._memo), maxsize=self._memo_size)
+
+    def run(self, n=None, event=False, settle=False, levelized=False):
+        if event + settle + levelized > 1:
+            raise CircuitError("Conflicting run modes")
+        if self._memo is None:
+            return self._run(n, event, settle, levelized)
+        ins, outs = self._memo_names
+        key = tuple(self._init.get(name, 0) for name in ins)
+        values = self._memo.get(key)
+        if values is not None:
+            self._memo.move_to_end(key)
+            self._memo_stats["hits"] += 1
+            self._settled = False
+            self._set_outputs(outs, values)
+            return 0 if event or settle else None
+        self._memo_stats["misses"] += 1
+        res = self._run(n, event, settle, levelized)
+        if n is None or event or settle or levelized:
+            self._memo[key] = tuple(getattr(self, name).value for name in outs)
+            if len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+                self._memo_stats["evictions"] += 1
+        return res
+
+    def _run(self, n, event, settle, levelized):
+        if n is None:
+            n = 100 if self.DEPTH is None else self.DEPTH + 1
+        if levelized:
+            return self._run_levelized(n)
+        if event:
+            return self._run_events(n)
+        if settle:
+            return self._run_settle(n)
         for _ in range(n):
             self.update()
 
 
 class Bridge(Circuit):
+    GATE = "buf"
+
     def inout(self):
         return {
             "in1": None,
             "out1": None
         }
 
-    def update(self):
-        super().update()
+    def evaluate(self):
         self.out1.value = self.in1.value
 
 
 class NOT(Circuit):
+    GATE = "not"
+
     def inout(self):
         return {
             "in1": None,
             "out1": None
         }
 
-    def update(self):
-        super().update()
+    def evaluate(self):
         self.out1.value = int(not self.in1.value)
 
 
 class AND(Circuit):
+    GATE = "and"
+
     def inout(self):
         return {
             "in1": None,
@@ -85,12 +408,13 @@ class AND(Circuit):
             "out1": None
         }
 
-    def update(self):
-        super().update()
+    def evaluate(self):
         self.out1.value = int(self.in1.value and self.in2.value)
 
 
 class OR(Circuit):
+    GATE = "or"
+
     def inout(self):
         return {
             "in1": None,
@@ -98,8 +422,7 @@ class OR(Circuit):
             "out1": None
         }
 
-    def update(self):
-        super().update()
+    def evaluate(self):
         self.out1.value = int(self.in1.value or self.in2.value)
 
 
@@ -466,6 +789,8 @@ class ADD(Circuit):
 
 
 class NOT8(Circuit):
+    OPERANDS = (8,)
+    RESULT = MSB8
     ELEMENTS = {
         NOT: ("n1", "n2", "n3", "n4", "n5", "n6", "n7", "n8"),
         Bridge: ("a1", "a2", "a3", "a4", "a5", "a6", "a7", "a8", "b1", "b2", "b3", "b4", "b5", "b6", "b7", "b8")
@@ -505,6 +830,8 @@ class NOT8(Circuit):
 
 
 class OR8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = MSB8
     ELEMENTS = {
         OR: ("o1", "o2", "o3", "o4", "o5", "o6", "o7", "o8"),
         Bridge: ("a1", "a2", "a3", "a4", "a5", "a6", "a7", "a8", "b1", "b2", "b3", "b4", "b5", "b6", "b7", "b8")
@@ -560,6 +887,8 @@ class OR8(Circuit):
 
 
 class AND8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = MSB8
     ELEMENTS = {
         AND: ("o1", "o2", "o3", "o4", "o5", "o6", "o7", "o8"),
         Bridge: ("a1", "a2", "a3", "a4", "a5", "a6", "a7", "a8", "b1", "b2", "b3", "b4", "b5", "b6", "b7", "b8")
@@ -691,6 +1020,8 @@ class AND8M(Circuit):
 
 
 class EQ8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = BIT
     ELEMENTS = {
         AND8M: ("ae1",),
         XNOR: ("xn1", "xn2", "xn3", "xn4", "xn5", "xn6", "xn7", "xn8"),
@@ -748,6 +1079,8 @@ class EQ8(Circuit):
 
 
 class NEQ8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = BIT
     ELEMENTS = {
         NOT: ("n",),
         EQ8: ("ae1",),
@@ -798,6 +1131,8 @@ class NEQ8(Circuit):
 
 
 class GT8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = BIT
     ELEMENTS = {
         NOT: ("b1", "b2", "b3", "b4", "b5", "b6", "b7", "b8", "c1", "c2", "c3", "c4", "c5", "c6", "c7", "c8"),
         XOR: ("o1", "o2", "o3", "o4", "o5", "o6", "o7", "o8"),
@@ -958,6 +1293,8 @@ class GT8(Circuit):
 
 
 class LT8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = BIT
     ELEMENTS = {
         NOT: ("b1", "b2", "b3", "b4", "b5", "b6", "b7", "b8", "c1", "c2", "c3", "c4", "c5", "c6", "c7", "c8"),
         XOR: ("o1", "o2", "o3", "o4", "o5", "o6", "o7", "o8"),
@@ -1118,6 +1455,8 @@ class LT8(Circuit):
 
 
 class GTE8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = BIT
     ELEMENTS = {
         NOT: ("b1", "b2", "b3", "b4", "b5", "b6", "b7", "b8"),
         XOR: ("o1", "o2", "o3", "o4", "o5", "o6", "o7", "o8"),
@@ -1248,6 +1587,8 @@ class GTE8(Circuit):
 
 
 class LTE8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = BIT
     ELEMENTS = {
         NOT: ("b1", "b2", "b3", "b4", "b5", "b6", "b7", "b8"),
         XOR: ("o1", "o2", "o3", "o4", "o5", "o6", "o7", "o8"),
@@ -1378,6 +1719,8 @@ class LTE8(Circuit):
 
 
 class ADD8(Circuit):
+    OPERANDS = (8, 8)
+    RESULT = LSB9
     ELEMENTS = {
         HADD: ("g8",),
         ADD: ("g2", "g3", "g4", "g5", "g6", "g7", "g1", "t1", "t2", "t3", "t4", "t5", "t6", "t7", "t8", "j1", "j2", "j3", "j4", "j5", "j6", "j7", "j8"),
@@ -1413,6 +1756,10 @@ class ADD8(Circuit):
             "out9": self.g1.out2
         }
 
+    @classmethod
+    def add(cls, a, b):
+        return cls.compute(a, b)
+
     def connect(self):
         return (
             (self.a8.out1, self.g8.in1),
@@ -1449,4 +1796,26 @@ class ADD8(Circuit):
 
 
 class ALU(Circuit):
-    pass
+    OPERANDS = (4, 8, 8)
+    RESULT = {
+        0: MSB8,
+        1: MSB8,
+        2: MSB8,
+        3: BIT,
+        4: BIT,
+        5: BIT,
+        6: BIT,
+        7: BIT,
+        8: BIT,
+        9: LSB9
+    }
+
+    @classmethod
+    def weights(cls, op, *operands):
+        if op not in cls.RESULT:
+            raise CircuitError("Bad operation")
+        return cls.RESULT[op]
+
+    @classmethod
+    def compute(cls, op, a, b=0):
+        return super().compute(op, a, b)
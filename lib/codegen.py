@@ -0,0 +1,25 @@
+def generate(netlist, name="circuit"):
+    args = [f"n{n}" for n in netlist.inputs]
+    lines = [f"def {name}({', '.join(args + ['mask=1'])}):"]
+    for op, out, ins in netlist.ordered():
+        if op == "and":
+            expr = " & ".join(f"n{i}" for i in ins)
+        elif op == "or":
+            expr = " | ".join(f"n{i}" for i in ins)
+        elif op == "not":
+            expr = f"n{ins[0]} ^ mask"
+        else:
+            expr = "0"
+        lines.append(f"    n{out} = {expr}")
+    outputs = ", ".join(f"n{n}" for n in netlist.outputs)
+    if len(netlist.outputs) == 1:
+        outputs += ","
+    lines.append(f"    return ({outputs})")
+    return "\n".join(lines) + "\n"
+
+
+def compile_netlist(netlist, name="circuit"):
+    source = generate(netlist, name)
+    scope = {}
+    exec(compile(source, f"<{netlist.name}>", "exec"), scope)
+    return scope[name]
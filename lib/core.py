@@ -1,4 +1,6 @@
 class Contact:
+    __slots__ = ("conductors", "value")
+
     def __init__(self):
         self.conductors = []
         self.value = 0
@@ -8,6 +10,8 @@ class Contact:
 
 
 class Input(Contact):
+    __slots__ = ()
+
     def update(self):
         try:
             self.value = max([c.value for c in self.conductors])
@@ -16,10 +20,12 @@ class Input(Contact):
 
 
 class Output(Contact):
-    pass
+    __slots__ = ()
 
 
 class BaseConductor:
+    __slots__ = ("contacts", "value")
+
     def __init__(self, *contacts):
         self.contacts = []
         for c in contacts:
@@ -34,4 +40,4 @@ class BaseConductor:
 
 
 class C(BaseConductor):
-    pass
+    __slots__ = ()
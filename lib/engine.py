@@ -0,0 +1,84 @@
+from lib.utils import CircuitError
+
+
+def evaluate(netlist, bits):
+    values = [0] * netlist.size
+    for n, b in zip(netlist.inputs, bits):
+        values[n] = int(b)
+    for op, out, ins in netlist.ordered():
+        if op == "and":
+            values[out] = int(all([values[i] for i in ins]))
+        elif op == "or":
+            values[out] = int(any([values[i] for i in ins]))
+        elif op == "not":
+            values[out] = int(not values[ins[0]])
+        else:
+            values[out] = 0
+    return [values[n] for n in netlist.outputs]
+
+
+def pack(vectors):
+    vectors = list(vectors)
+    if not vectors:
+        return []
+    words = []
+    for i in range(len(vectors[0])):
+        column = ''.join('1' if v[i] else '0' for v in reversed(vectors))
+        words.append(int(column, 2))
+    return words
+
+
+def unpack(words, count):
+    columns = [format(w, f"0{count}b")[::-1] for w in words]
+    return [[int(c[k]) for c in columns] for k in range(count)]
+
+
+def evaluate_packed(netlist, words, count):
+    mask = (1 << count) - 1
+    values = [0] * netlist.size
+    for n, w in zip(netlist.inputs, words):
+        values[n] = w & mask
+    for op, out, ins in netlist.ordered():
+        if op == "and":
+            v = mask
+            for i in ins:
+                v &= values[i]
+        elif op == "or":
+            v = 0
+            for i in ins:
+                v |= values[i]
+        elif op == "not":
+            v = values[ins[0]] ^ mask
+        else:
+            v = 0
+        values[out] = v
+    return [values[n] for n in netlist.outputs]
+
+
+def evaluate_array(netlist, inputs):
+    import numpy
+
+    inputs = numpy.asarray(inputs)
+    if inputs.ndim != 2 or inputs.shape[1] != len(netlist.inputs):
+        raise CircuitError("Bad input shape")
+    columns = inputs.astype(bool).T
+    values = [None] * netlist.size
+    for n, column in zip(netlist.inputs, columns):
+        values[n] = column
+    for op, out, ins in netlist.ordered():
+        if op == "and":
+            v = values[ins[0]]
+            for i in ins[1:]:
+                v = numpy.logical_and(v, values[i])
+        elif op == "or":
+            v = values[ins[0]]
+            for i in ins[1:]:
+                v = numpy.logical_or(v, values[i])
+        elif op == "not":
+            v = numpy.logical_not(values[ins[0]])
+        else:
+            v = numpy.zeros(len(inputs), dtype=bool)
+        values[out] = v
+    if not netlist.outputs:
+        return numpy.zeros((len(inputs), 0), dtype=numpy.uint8)
+    return numpy.stack([values[n] for n in netlist.outputs], axis=1).astype(numpy.uint8)
@@ -0,0 +1,153 @@
+import argparse
+import mmap
+import struct
+import sys
+from itertools import islice
+
+from lib.engine import pack, unpack
+from lib.stream import circuit_class, decode, encode, width_bytes
+from lib.utils import CircuitError
+
+MAGIC = b"ALUGOLD1"
+HEADER = struct.Struct("<8s32sHHQ12x")
+_PLANES = [bytes(48 + (v >> k & 1) for v in range(256)) for k in range(8)]
+
+
+def write_golden(dst, name, inputs, outputs, pairs):
+    start = dst.tell()
+    dst.write(HEADER.pack(MAGIC, name.encode(), inputs, outputs, 0))
+    count = 0
+    for vector, expected in pairs:
+        if len(vector) != inputs or len(expected) != outputs:
+            raise CircuitError("Bad record width")
+        dst.write(encode(vector) + encode(expected))
+        count += 1
+    end = dst.tell()
+    dst.seek(start)
+    dst.write(HEADER.pack(MAGIC, name.encode(), inputs, outputs, count))
+    dst.seek(end)
+    return count
+
+
+def record(cls, dst, vectors, chunk=4096):
+    nl = cls.netlist()
+    f = cls.compile()
+
+    def pairs():
+        it = iter(vectors)
+        while True:
+            rows = list(islice(it, chunk))
+            if not rows:
+                return
+            words = f(*pack(rows), mask=(1 << len(rows)) - 1)
+            yield from zip(rows, unpack(words, len(rows)))
+
+    return write_golden(dst, cls.__name__, len(nl.inputs), len(nl.outputs), pairs())
+
+
+class Golden:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            try:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise CircuitError("Truncated golden file")
+        if len(self.map) < HEADER.size:
+            self.map.close()
+            raise CircuitError("Truncated golden file")
+        magic, name, self.inputs, self.outputs, self.count = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.map.close()
+            raise CircuitError("Not a golden file")
+        self.name = name.rstrip(b"\0").decode()
+        self.in_size = width_bytes(self.inputs)
+        self.size = self.in_size + width_bytes(self.outputs)
+        if len(self.map) < HEADER.size + self.count * self.size:
+            self.map.close()
+            raise CircuitError("Truncated golden file")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        offset = HEADER.size + index * self.size
+        record = self.map[offset:offset + self.size]
+        return decode(record[:self.in_size], self.inputs), decode(record[self.in_size:], self.outputs)
+
+    def _planes(self, block, offset, field, width):
+        words = []
+        for p in range(width - 1, -1, -1):
+            column = block[offset + field - 1 - p // 8::self.size]
+            words.append(int(column.translate(_PLANES[p % 8])[::-1], 2))
+        return words
+
+    def replay(self, cls=None, chunk=4096, limit=10):
+        cls = cls or circuit_class(self.name)
+        nl = cls.netlist()
+        if (len(nl.inputs), len(nl.outputs)) != (self.inputs, self.outputs):
+            raise CircuitError("Golden widths do not match circuit")
+        f = cls.compile()
+        in_size, out_size = self.in_size, self.size - self.in_size
+        failed = 0
+        mismatches = []
+        for start in range(0, self.count, chunk):
+            stop = min(start + chunk, self.count)
+            block = self.map[HEADER.size + start * self.size:HEADER.size + stop * self.size]
+            words = self._planes(block, 0, in_size, self.inputs)
+            expected = self._planes(block, in_size, out_size, self.outputs)
+            diff = 0
+            for got, want in zip(f(*words, mask=(1 << (stop - start)) - 1), expected):
+                diff |= got ^ want
+            failed += bin(diff).count("1")
+            while diff and len(mismatches) < limit:
+                low = diff & -diff
+                mismatches.append(start + low.bit_length() - 1)
+                diff ^= low
+        return failed, mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or replay golden responses")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="capture exhaustive responses of a circuit")
+    rec.add_argument("circuit", help="circuit class name, e.g. ADD8")
+    rec.add_argument("path")
+    rep = sub.add_parser("replay", help="compare a circuit against a golden file")
+    rep.add_argument("path")
+    rep.add_argument("--circuit", help="circuit class name, taken from the header by default")
+    rep.add_argument("--chunk", type=int, default=4096, help="vectors per evaluation")
+    rep.add_argument("--limit", type=int, default=10, help="mismatches to report")
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "record":
+            cls = circuit_class(args.circuit)
+            width = len(cls.netlist().inputs)
+            vectors = (tuple((v >> (width - 1 - j)) & 1 for j in range(width)) for v in range(1 << width))
+            with open(args.path, "wb") as dst:
+                print(f"{args.circuit}: {record(cls, dst, vectors)} vectors")
+            return 0
+        with Golden(args.path) as g:
+            cls = circuit_class(args.circuit) if args.circuit else None
+            failed, mismatches = g.replay(cls, args.chunk, args.limit)
+            print(f"{args.circuit or g.name}: {len(g)} vectors, {failed} mismatches")
+            for index in mismatches:
+                inputs, expected = g[index]
+                print(f"  #{index} input: {inputs}, correct: {expected}")
+    except (CircuitError, OSError) as e:
+        parser.exit(1, f"{e}\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import hashlib
+import inspect
+import mmap
+import os
+import struct
+import sys
+
+from lib import codegen
+from lib.cache import cache_dir, prune, structural_hash
+from lib.circuit import bit_table
+from lib.utils import CircuitError
+
+MAGIC = b"ALULUT1\0"
+HEADER = struct.Struct("<8s32s64sHHB3x")
+MAX_INPUTS = 24
+_BINARY = bytes.maketrans(b"01", b"\0\1")
+
+
+def _lanes(word, count, size):
+    lanes = bytearray(count * size)
+    lanes[size - 1::size] = format(word, f"0{count}b")[::-1].encode().translate(_BINARY)
+    return int.from_bytes(lanes, "big")
+
+
+def lut_digest(cls):
+    parts = [structural_hash(cls), inspect.getsource(codegen), inspect.getsource(sys.modules[__name__])]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def build_lut(cls, dst, chunk=1 << 16):
+    nl = cls.netlist()
+    inputs, outputs = len(nl.inputs), len(nl.outputs)
+    if inputs > MAX_INPUTS:
+        raise CircuitError("Too many inputs for a LUT")
+    f = cls.compile()
+    size = (outputs + 7) // 8
+    total = 1 << inputs
+    bits = min(chunk.bit_length() - 1, inputs)
+    count = 1 << bits
+    mask = (1 << count) - 1
+    pattern = [mask // ((1 << (2 << p)) - 1) * (((1 << (1 << p)) - 1) << (1 << p)) for p in range(bits)]
+    dst.write(HEADER.pack(MAGIC, cls.__name__.encode(), lut_digest(cls).encode(), inputs, outputs, size))
+    for base in range(0, total, count):
+        words = [
+            pattern[p] if p < bits else mask if base >> p & 1 else 0
+            for p in range(inputs - 1, -1, -1)
+        ]
+        entries = 0
+        for k, word in enumerate(f(*words, mask=mask)):
+            entries |= _lanes(word, count, size) << (outputs - 1 - k)
+        dst.write(entries.to_bytes(count * size, "big"))
+    return total
+
+
+class LUT:
+    def __init__(self, path, circuit=None):
+        with open(path, "rb") as f:
+            try:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise CircuitError("Truncated LUT")
+        if len(self.map) < HEADER.size:
+            self.map.close()
+            raise CircuitError("Truncated LUT")
+        magic, name, digest, self.inputs, self.outputs, self.size = HEADER.unpack_from(self.map)
+        if magic != MAGIC or len(self.map) != HEADER.size + (self.size << self.inputs):
+            self.map.close()
+            raise CircuitError("Not a LUT")
+        self.name = name.rstrip(b"\0").decode()
+        self.hash = digest.decode()
+        self.circuit = circuit
+        self.rows = bit_table(self.outputs) if self.outputs <= 16 else None
+        self.results = {}
+
+    def __len__(self):
+        return 1 << self.inputs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+
+    def __getitem__(self, index):
+        if not 0 <= index < 1 << self.inputs:
+            raise IndexError(index)
+        if self.size == 1:
+            return self.map[HEADER.size + index]
+        offset = HEADER.size + index * self.size
+        return int.from_bytes(self.map[offset:offset + self.size], "big")
+
+    def _bits(self, value):
+        if self.rows is not None:
+            return self.rows[value]
+        return tuple((value >> (self.outputs - 1 - k)) & 1 for k in range(self.outputs))
+
+    def lookup(self, *bits):
+        if len(bits) != self.inputs:
+            raise CircuitError("Bad input vector")
+        index = 0
+        for b in bits:
+            index = index << 1 | (1 if b else 0)
+        return self._bits(self[index])
+
+    def compute(self, *operands):
+        if self.circuit is None or not self.circuit.OPERANDS:
+            raise CircuitError("No result encoding")
+        if len(operands) != len(self.circuit.OPERANDS):
+            raise CircuitError("Bad operands")
+        index = 0
+        for width, value in zip(self.circuit.OPERANDS, operands):
+            if not 0 <= value < 1 << width:
+                raise CircuitError("Operand out of range")
+            index = index << width | value
+        weights = self.circuit.weights(*operands)
+        results = self.results.get(weights)
+        if results is None:
+            if self.rows is None:
+                return sum([w for w, bit in zip(weights, self._bits(self[index])) if bit])
+            results = self.results[weights] = [sum([w for w, bit in zip(weights, bits) if bit]) for bits in self.rows]
+        return results[self[index]]
+
+
+def load_lut(cls, directory=None):
+    directory = directory or cache_dir()
+    if not directory:
+        raise CircuitError("No cache directory")
+    digest = lut_digest(cls)
+    name = f"{cls.__name__}-{digest[:16]}.lut"
+    path = os.path.join(directory, name)
+    try:
+        lut = LUT(path, cls)
+    except (OSError, ValueError):
+        pass
+    else:
+        if lut.hash == digest:
+            return lut
+        lut.close()
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        build_lut(cls, f)
+    os.replace(tmp, path)
+    prune(directory, cls.__name__, name, ".lut")
+    return LUT(path, cls)
@@ -0,0 +1,136 @@
+from lib.core import Input
+from lib.utils import CircuitError
+
+
+class Netlist:
+    def __init__(self, name, inputs, outputs, gates, size):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.gates = gates
+        self.size = size
+        self._order = None
+
+    def ordered(self):
+        if self._order is None:
+            self._order = levelize(self)
+        return self._order
+
+    def __len__(self):
+        return len(self.gates)
+
+    def __repr__(self):
+        return f"<Netlist {self.name}: {len(self.inputs)} in, {len(self.outputs)} out, {len(self.gates)} gates>"
+
+
+def levelize(netlist):
+    driver = {}
+    for g in netlist.gates:
+        driver[g[1]] = g
+    level = {}
+    for n in netlist.inputs:
+        level[n] = 0
+    pending = list(netlist.gates)
+    while pending:
+        rest = []
+        for g in pending:
+            if all(i in level for i in g[2] if i in driver):
+                level[g[1]] = max([level.get(i, 0) for i in g[2]], default=0) + 1
+            else:
+                rest.append(g)
+        if len(rest) == len(pending):
+            raise CircuitError("Combinational cycle")
+        pending = rest
+    return sorted(netlist.gates, key=lambda g: level[g[1]])
+
+
+def contact_names(circuit, prefix):
+    names = [n for n in circuit.inout() if n.startswith(prefix)]
+    return sorted(names, key=lambda n: int(n[len(prefix):]))
+
+
+class _Flattener:
+    def __init__(self, top):
+        self.top = top
+        self.prims = top.primitives()
+        self.owner = {}
+        for p in self.prims:
+            for n in p._output_names:
+                self.owner[getattr(p, n)] = p
+        self.net = {}
+        self.gates = []
+        self.size = 0
+        self.zero = None
+        self.active = set()
+
+    def new(self):
+        self.size += 1
+        return self.size - 1
+
+    def drivers(self, contact):
+        res = []
+        for c in contact.conductors:
+            for o in c.contacts:
+                if o not in res:
+                    res.append(o)
+        return res
+
+    def resolve(self, contact):
+        if contact in self.net:
+            return self.net[contact]
+        drivers = self.drivers(contact)
+        if not drivers:
+            if self.zero is None:
+                self.zero = self.new()
+                self.gates.append(("zero", self.zero, ()))
+            n = self.zero
+        elif len(drivers) == 1:
+            n = self.output(drivers[0])
+        else:
+            n = self.new()
+            self.gates.append(("or", n, tuple(self.output(o) for o in drivers)))
+        self.net[contact] = n
+        return n
+
+    def output(self, contact):
+        if contact in self.net:
+            return self.net[contact]
+        p = self.owner[contact]
+        if p.GATE != "buf":
+            raise CircuitError(f"Unknown gate {type(p).__name__}")
+        if p in self.active:
+            raise CircuitError("Bridge loop")
+        self.active.add(p)
+        n = self.resolve(p.in1)
+        self.active.discard(p)
+        self.net[contact] = n
+        return n
+
+    def run(self):
+        inputs = []
+        for name in contact_names(self.top, "in"):
+            n = self.new()
+            self.net[getattr(self.top, name)] = n
+            inputs.append(n)
+        gated = [p for p in self.prims if p.GATE not in (None, "buf")]
+        for p in gated:
+            for name in p._output_names:
+                self.net[getattr(p, name)] = self.new()
+        for p in gated:
+            ins = tuple(self.resolve(getattr(p, name)) for name in p._input_names)
+            for name in p._output_names:
+                self.gates.append((p.GATE, self.net[getattr(p, name)], ins))
+        outputs = []
+        for name in contact_names(self.top, "out"):
+            contact = getattr(self.top, name)
+            if isinstance(contact, Input):
+                outputs.append(self.resolve(contact))
+            else:
+                outputs.append(self.output(contact))
+        return Netlist(type(self.top).__name__, inputs, outputs, self.gates, self.size)
+
+
+def flatten(cls):
+    if cls.GATE is None and not cls.ELEMENTS:
+        raise CircuitError("Empty scheme")
+    return _Flattener(cls()).run()
@@ -0,0 +1,93 @@
+from lib.netlist import Netlist
+from lib.utils import CircuitError
+
+ZERO = "zero"
+ONE = "one"
+
+
+class _Builder:
+    def __init__(self, netlist):
+        self.netlist = netlist
+        self.gates = {}
+        self.order = []
+        self.inverse = {}
+        self.size = len(netlist.inputs)
+
+    def add(self, op, ins):
+        key = (op, ins)
+        if key not in self.gates:
+            self.gates[key] = self.size
+            self.order.append((op, self.size, ins))
+            if op == "not":
+                self.inverse[self.size] = ins[0]
+            self.size += 1
+        return self.gates[key]
+
+    def negate(self, x):
+        if x == ZERO:
+            return ONE
+        if x == ONE:
+            return ZERO
+        if x in self.inverse:
+            return self.inverse[x]
+        return self.add("not", (x,))
+
+    def combine(self, op, ins):
+        unit, zero = (ONE, ZERO) if op == "and" else (ZERO, ONE)
+        if zero in ins:
+            return zero
+        ins = sorted(set(i for i in ins if i != unit))
+        if not ins:
+            return unit
+        if len(ins) == 1:
+            return ins[0]
+        if any(self.inverse.get(i) in ins for i in ins):
+            return zero
+        return self.add(op, tuple(ins))
+
+    def literal(self, x):
+        if x == ZERO:
+            return self.add("zero", ())
+        if x == ONE:
+            return self.add("not", (self.add("zero", ()),))
+        return x
+
+
+def _sweep(name, inputs, outputs, gates):
+    driver = {g[1]: g for g in gates}
+    live = set()
+    stack = list(outputs)
+    while stack:
+        n = stack.pop()
+        if n in live:
+            continue
+        live.add(n)
+        if n in driver:
+            stack.extend(driver[n][2])
+    renumber = {n: i for i, n in enumerate(inputs)}
+    kept = []
+    for op, out, ins in gates:
+        if out in live:
+            renumber[out] = len(renumber)
+            kept.append((op, out, ins))
+    kept = [(op, renumber[out], tuple(renumber[i] for i in ins)) for op, out, ins in kept]
+    return Netlist(name, [renumber[n] for n in inputs], [renumber[n] for n in outputs], kept, len(renumber))
+
+
+def optimize(netlist):
+    try:
+        ordered = netlist.ordered()
+    except CircuitError:
+        return _sweep(netlist.name, netlist.inputs, netlist.outputs, netlist.gates)
+    b = _Builder(netlist)
+    value = {n: i for i, n in enumerate(netlist.inputs)}
+    for op, out, ins in ordered:
+        ins = [value[i] for i in ins]
+        if op == "not":
+            value[out] = b.negate(ins[0])
+        elif op in ("and", "or"):
+            value[out] = b.combine(op, ins)
+        else:
+            value[out] = ZERO
+    outputs = [b.literal(value[n]) for n in netlist.outputs]
+    return _sweep(netlist.name, list(range(len(netlist.inputs))), outputs, b.order)
@@ -0,0 +1,93 @@
+from time import perf_counter
+
+from lib.circuit import Circuit
+from lib.core import BaseConductor, Input
+
+KINDS = ("update", "evaluate", "conductor", "input")
+
+
+class Profiler:
+    def __init__(self, *roots):
+        self.paths = {}
+        self.classes = {}
+        self.stats = {}
+        self.gates = set()
+        self._saved = None
+        for r in roots:
+            self._walk(r, type(r).__name__)
+
+    def _walk(self, c, path):
+        self.paths[c] = path
+        self.classes[path] = type(c).__name__
+        if c.GATE is not None:
+            self.gates.add(type(c))
+        for cond in c._conductors:
+            self.paths[cond] = path
+        for n in c._input_names:
+            self.paths[getattr(c, n)] = path
+        for names in c.ELEMENTS.values():
+            for n in names:
+                self._walk(getattr(c, n), f"{path}.{n}")
+
+    def _record(self, obj, kind, elapsed):
+        path = self.paths.get(obj, "?")
+        s = self.stats.get(path)
+        if s is None:
+            s = self.stats[path] = dict.fromkeys(KINDS, 0)
+            s.update(dict.fromkeys((f"{k}_s" for k in KINDS), 0.0))
+        s[kind] += 1
+        s[f"{kind}_s"] += elapsed
+
+    def _wrap(self, func, kind):
+        record = self._record
+
+        def wrapper(obj):
+            start = perf_counter()
+            try:
+                return func(obj)
+            finally:
+                record(obj, kind, perf_counter() - start)
+        return wrapper
+
+    def __enter__(self):
+        self._saved = (Circuit.update, BaseConductor.update, Input.update)
+        self._evaluate = {cls: cls.__dict__["evaluate"] for cls in self.gates}
+        Circuit.update = self._wrap(Circuit.update, "update")
+        BaseConductor.update = self._wrap(BaseConductor.update, "conductor")
+        Input.update = self._wrap(Input.update, "input")
+        for cls, func in self._evaluate.items():
+            cls.evaluate = self._wrap(func, "evaluate")
+        return self
+
+    def __exit__(self, *exc):
+        Circuit.update, BaseConductor.update, Input.update = self._saved
+        for cls, func in self._evaluate.items():
+            cls.evaluate = func
+        self._saved = None
+
+    def by_path(self):
+        return {path: dict(s) for path, s in self.stats.items()}
+
+    def by_class(self):
+        res = {}
+        for path, s in self.stats.items():
+            total = res.setdefault(self.classes.get(path, "?"), dict.fromkeys(s, 0))
+            for k, v in s.items():
+                total[k] += v
+        return res
+
+    def table(self, limit=20):
+        rows = sorted(self.stats.items(), key=lambda i: -(i[1]["update_s"] + i[1]["evaluate_s"]))[:limit]
+        lines = [f"{'path':40} {'class':8} {'update':>8} {'ms':>9} {'eval':>8} {'ms':>9} {'cond':>8} {'ms':>9} {'input':>8} {'ms':>9}"]
+        for path, s in rows:
+            lines.append(
+                f"{path:40} {self.classes.get(path, '?'):8} "
+                f"{s['update']:8} {s['update_s'] * 1000:9.2f} "
+                f"{s['evaluate']:8} {s['evaluate_s'] * 1000:9.2f} "
+                f"{s['conductor']:8} {s['conductor_s'] * 1000:9.2f} "
+                f"{s['input']:8} {s['input_s'] * 1000:9.2f}"
+            )
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.table()
@@ -0,0 +1,119 @@
+from lib.codegen import compile_netlist
+from lib.utils import CircuitError
+
+
+class Net:
+    __slots__ = ("values", "index")
+
+    def __init__(self, values, index):
+        self.values = values
+        self.index = index
+
+    @property
+    def value(self):
+        return self.values[self.index]
+
+    @value.setter
+    def value(self, value):
+        self.values[self.index] = int(bool(value))
+
+
+class Topology:
+    __slots__ = ("netlist", "gates", "acyclic", "program", "names")
+
+    def __init__(self, netlist):
+        self.netlist = netlist
+        try:
+            self.gates = netlist.ordered()
+            self.acyclic = True
+            self.program = compile_netlist(netlist)
+        except CircuitError:
+            self.gates = netlist.gates
+            self.acyclic = False
+            self.program = None
+        self.names = {}
+        for i, n in enumerate(netlist.inputs):
+            self.names[f"in{i + 1}"] = n
+        for i, n in enumerate(netlist.outputs):
+            self.names[f"out{i + 1}"] = n
+
+    def net(self, name):
+        try:
+            return self.names[name]
+        except KeyError:
+            raise CircuitError("Bad contacts name")
+
+
+class State:
+    __slots__ = ("topology", "values", "_init")
+
+    def __init__(self, topology, **kwargs):
+        self.topology = topology
+        self.values = bytearray(topology.netlist.size)
+        self._init = {}
+        self.set_inputs(**kwargs)
+
+    def net(self, name):
+        return self.topology.net(name)
+
+    def __getattr__(self, name):
+        if not name.startswith(("in", "out")):
+            raise AttributeError(name)
+        try:
+            return Net(self.values, self.net(name))
+        except CircuitError:
+            raise AttributeError(name)
+
+    def set_inputs(self, **kwargs):
+        for name in kwargs:
+            self.net(name)
+        self._init.update(kwargs)
+
+    def reset(self):
+        self.values[:] = bytes(len(self.values))
+
+    def update(self):
+        values = self.values
+        changed = False
+        for op, out, ins in self.topology.gates:
+            if op == "and":
+                v = 1
+                for i in ins:
+                    v &= values[i]
+            elif op == "or":
+                v = 0
+                for i in ins:
+                    v |= values[i]
+            elif op == "not":
+                v = values[ins[0]] ^ 1
+            else:
+                v = 0
+            if values[out] != v:
+                values[out] = v
+                changed = True
+        return changed
+
+    def run(self, n=100):
+        topology = self.topology
+        values = self.values
+        sinks = []
+        for name, value in self._init.items():
+            if name.startswith("in"):
+                values[topology.net(name)] = int(bool(value))
+            else:
+                sinks.append((topology.net(name), value))
+        if topology.acyclic:
+            netlist = topology.netlist
+            res = topology.program(*[values[i] for i in netlist.inputs])
+            for net, value in zip(netlist.outputs, res):
+                values[net] = value
+            sweeps = 1
+        else:
+            for sweeps in range(1, n + 1):
+                if not self.update():
+                    break
+            else:
+                raise CircuitError("Circuit does not settle")
+        for net, sink in sinks:
+            sink.value = values[net]
+        return sweeps
@@ -0,0 +1,113 @@
+import argparse
+import sys
+from itertools import islice
+
+from lib import circuit
+from lib.circuit import Circuit, bit_table
+from lib.engine import pack, unpack
+from lib.utils import CircuitError
+
+FORMATS = ("text", "binary")
+
+
+def width_bytes(width):
+    return (width + 7) // 8
+
+
+def read_text(src, width):
+    for number, line in enumerate(src, 1):
+        if line.translate(None, b"01 \t\r\n\v\f"):
+            raise CircuitError(f"Bad vector on line {number}")
+        bits = tuple(c - 48 for c in line if c in b"01")
+        if not bits and not line.strip():
+            continue
+        if len(bits) != width:
+            raise CircuitError(f"Bad vector on line {number}")
+        yield bits
+
+
+def decode(record, width):
+    table = bit_table(8)
+    bits = ()
+    for byte in record:
+        bits += table[byte]
+    return bits[len(bits) - width:]
+
+
+def encode(row):
+    v = 0
+    for b in row:
+        v = v << 1 | b
+    return v.to_bytes(width_bytes(len(row)), "big")
+
+
+def read_binary(src, width):
+    size = width_bytes(width)
+    while True:
+        record = src.read(size)
+        if not record:
+            return
+        if len(record) != size:
+            raise CircuitError("Truncated vector")
+        yield decode(record, width)
+
+
+def write_text(dst, rows):
+    dst.write(b"".join(bytes(48 + b for b in row) + b"\n" for row in rows))
+
+
+def write_binary(dst, rows):
+    dst.write(b"".join(encode(row) for row in rows))
+
+
+READERS = {"text": read_text, "binary": read_binary}
+WRITERS = {"text": write_text, "binary": write_binary}
+
+
+def stream(cls, src, dst, fmt="text", chunk=4096):
+    nl = cls.netlist()
+    f = cls.compile()
+    vectors = READERS[fmt](src, len(nl.inputs))
+    count = 0
+    while True:
+        rows = list(islice(vectors, chunk))
+        if not rows:
+            return count
+        words = f(*pack(rows), mask=(1 << len(rows)) - 1)
+        WRITERS[fmt](dst, unpack(words, len(rows)))
+        count += len(rows)
+
+
+def circuit_class(name):
+    cls = getattr(circuit, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, Circuit)):
+        raise CircuitError(f"Unknown circuit {name}")
+    return cls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream input vectors through a circuit")
+    parser.add_argument("circuit", help="circuit class name, e.g. ADD8")
+    parser.add_argument("--input", help="vector file, stdin by default")
+    parser.add_argument("--output", help="result file, stdout by default")
+    parser.add_argument("--format", choices=FORMATS, default="text")
+    parser.add_argument("--chunk", type=int, default=4096, help="vectors per evaluation")
+    args = parser.parse_args(argv)
+    src = dst = None
+    try:
+        src = open(args.input, "rb") if args.input else sys.stdin.buffer
+        dst = open(args.output, "wb") if args.output else sys.stdout.buffer
+        stream(circuit_class(args.circuit), src, dst, args.format, args.chunk)
+    except (CircuitError, OSError) as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        if args.input and src:
+            src.close()
+        if args.output and dst:
+            dst.close()
+        elif dst:
+            dst.flush()
+
+
+if __name__ == "__main__":
+    main()
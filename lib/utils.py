@@ -3,26 +3,73 @@ class CircuitError(ValueError):
 
 
 class Cell:
+    __slots__ = ("value",)
+
     def __init__(self):
         self.value = None
 
 
+class BufferCell:
+    __slots__ = ("buffer", "index")
+
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def value(self):
+        return self.buffer[self.index]
+
+    @value.setter
+    def value(self, value):
+        self.buffer[self.index] = 1 if value else 0
+
+
 class Display:
-    def __init__(self, n):
+    def __init__(self, n, rows=1):
         self.n = n
-        for i in range(self.n):
-            setattr(self, f"c{i + 1}", Cell())
+        self.rows = rows
+        self.buffer = bytearray(n * rows)
+        self._view = memoryview(self.buffer)[:n]
+        for i, c in enumerate(self.cells()):
+            setattr(self, f"c{i + 1}", c)
+
+    def cells(self, row=0):
+        return tuple(BufferCell(self.buffer, row * self.n + i) for i in range(self.n))
+
+    @staticmethod
+    def encode(outputs):
+        if isinstance(outputs, (list, tuple)):
+            return bytes(1 if o else 0 for o in outputs)
+        return bytes((1 if outputs else 0,))
 
     def res(self):
         if self.n == 1:
-            return self.c1.value
-        r = []
-        for i in range(self.n):
-            r.append(getattr(self, f"c{i + 1}").value)
-        return r
+            return self.buffer[0]
+        return self._view
+
+    def packed(self, row=0):
+        v = 0
+        for i in range(row * self.n, (row + 1) * self.n):
+            v = v << 1 | self.buffer[i]
+        return v
 
     def __str__(self):
-        return ' '.join(map(str, self.res()))
+        return ' '.join(map(str, self.buffer[:self.n]))
 
     def check(self, outputs):
-        return self.res() == outputs
+        if isinstance(outputs, (bytes, bytearray, memoryview)):
+            return self._view == outputs
+        if isinstance(outputs, (list, tuple)):
+            return self._view == self.encode(outputs)
+        if self.n == 1:
+            return self.buffer[0] == (1 if outputs else 0)
+        return self.packed() == outputs
+
+    def check_batch(self, expected):
+        if self.buffer == expected:
+            return []
+        n = self.n
+        view = memoryview(self.buffer)
+        expected = memoryview(expected)
+        return [r for r in range(self.rows) if view[r * n:(r + 1) * n] != expected[r * n:(r + 1) * n]]
@@ -1,9 +1,30 @@
+import io
+import json
+import os
 import random
-from unittest import TestCase
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import TestCase, skipIf
 from itertools import product
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from lib.utils import Display, CircuitError
-from lib.circuit import NOR, NAND, XOR, AND3, OR3, XNOR, ODD, MT1, HADD, \
+from lib.aig import AIG, FALSE
+from lib.cache import load_netlist, structural_hash
+from lib.codegen import generate
+from lib.engine import evaluate_packed, pack, unpack
+from lib.golden import Golden, main as golden_main, record, write_golden
+from lib.lut import LUT, build_lut, load_lut, lut_digest
+from lib.netlist import Netlist, flatten, levelize
+from lib.optimize import optimize
+from lib.profiler import Profiler
+from lib.stream import main as stream_main, stream
+from verify import verify
+from lib.circuit import LSB9, Circuit, Bridge, NOT, OR, NOR, NAND, XOR, AND3, OR3, XNOR, ODD, MT1, HADD, \
     ADD, SC, NOT8, AND8, OR8, EQ8, NEQ8, GT8, LT8, GTE8, LTE8, ADD8, ALU
 
 
@@ -28,29 +49,105 @@ class BaseTest(TestCase):
                     continue
             self.TM[i] = self.F(*i)
 
-    def init_circuit(self, inputs):
-        d = Display(self.OUT)
+    def init_circuit(self, inputs, d=None, row=0):
+        if d is None:
+            d = Display(self.OUT)
         kwargs = {}
         for i in range(self.IN):
             kwargs[f'in{i + 1}'] = inputs[i]
-        for i in range(self.OUT):
-            kwargs[f'out{i + 1}'] = getattr(d, f"c{i + 1}")
+        for i, cell in enumerate(d.cells(row)):
+            kwargs[f'out{i + 1}'] = cell
         c = self.CIRCUIT(**kwargs)
         return c, d
 
-    def test(self):
+    def require_scheme(self):
         if not self.CIRCUIT:
-            return
+            return False
         if not self.CIRCUIT.ELEMENTS:
             raise CircuitError("Empty scheme")
+        return True
+
+    def run_tm(self, **kwargs):
+        if not self.require_scheme():
+            return
+        rows = [(i, o) for i, o in self.TM.items() if o is not None]
+        d = Display(self.OUT, len(rows))
+        for row, (inputs, outputs) in enumerate(rows):
+            c, d = self.init_circuit(inputs, d, row)
+            c.run(**kwargs)
+        expected = b"".join(Display.encode(outputs) for inputs, outputs in rows)
+        for row in d.check_batch(expected):
+            inputs, outputs = rows[row]
+            print(f"Input: {inputs}, output: {list(d.buffer[row * d.n:(row + 1) * d.n])}, correct: {outputs}")
+            raise Exception
+
+    def test(self):
+        self.run_tm()
+
+    def test_event(self):
+        self.run_tm(event=True)
+
+    def test_settle(self):
+        self.run_tm(settle=True)
+
+    def test_levelized(self):
+        self.run_tm(levelized=True)
+
+    def test_reuse(self):
+        if not self.require_scheme():
+            return
+        c, d = self.init_circuit([0] * self.IN)
         for inputs, outputs in self.TM.items():
             if outputs is None:
                 continue
-            c, d = self.init_circuit(inputs)
-            c.run()
-            if not d.check(outputs):
-                print(f"Input: {inputs}, output: {d.res()}, correct: {outputs}")
-                raise Exception
+            c.set_inputs(**{f"in{i + 1}": v for i, v in enumerate(inputs)})
+            c.run(event=True)
+            self.assertTrue(d.check(outputs), inputs)
+
+    def test_compiled(self):
+        if not self.require_scheme():
+            return
+        f = self.CIRCUIT.compile()
+        self.check_rows(self.TM, [f(*inputs) for inputs in self.TM])
+        rows = list(product((0, 1), repeat=self.IN))
+        words = f(*pack(rows), mask=(1 << len(rows)) - 1)
+        self.check_rows(rows, unpack(words, len(rows)))
+
+    def test_state(self):
+        if not self.require_scheme():
+            return
+        d = Display(self.OUT)
+        s = self.CIRCUIT.state(**{f"out{i + 1}": getattr(d, f"c{i + 1}") for i in range(self.OUT)})
+        for inputs, outputs in self.TM.items():
+            if outputs is None:
+                continue
+            s.set_inputs(**{f"in{i + 1}": v for i, v in enumerate(inputs)})
+            s.run()
+            self.assertTrue(d.check(outputs), inputs)
+
+    def check_rows(self, rows, results):
+        for inputs, outputs in zip(rows, results):
+            expected = self.F(*inputs)
+            if expected is None:
+                continue
+            expected = expected if isinstance(expected, list) else [expected]
+            self.assertEqual(list(outputs), [int(i) for i in expected], inputs)
+
+    def test_packed(self):
+        if not self.require_scheme():
+            return
+        rows = list(product((0, 1), repeat=self.IN))
+        words = evaluate_packed(self.CIRCUIT.netlist(), pack(rows), len(rows))
+        self.check_rows(rows, unpack(words, len(rows)))
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_batch(self):
+        if not self.require_scheme():
+            return
+        rows = list(product((0, 1), repeat=self.IN))
+        res = self.CIRCUIT.evaluate_batch(numpy.array(rows, dtype=numpy.uint8))
+        self.assertEqual(res.shape, (len(rows), self.OUT))
+        self.check_rows(rows, res.tolist())
 
 
 class TestNOR(BaseTest):
@@ -309,3 +406,551 @@ class TestALU(BaseTest):
         res += [0] * (9 - len(res))
 
         return res
+
+
+class Ring(Circuit):
+    ELEMENTS = {
+        NOT: ("n1",)
+    }
+
+    def inout(self):
+        return {
+            "out1": self.n1.out1
+        }
+
+    def connect(self):
+        return (
+            (self.n1.out1, self.n1.in1),
+        )
+
+
+class Dead(Circuit):
+    ELEMENTS = {
+        NOT: ("n1", "n2")
+    }
+
+    def inout(self):
+        return {
+            "in1": self.n1.in1,
+            "out1": self.n1.out1
+        }
+
+    def connect(self):
+        return (
+            (self.n1.out1, self.n2.in1),
+        )
+
+
+class Latch(Circuit):
+    ELEMENTS = {
+        OR: ("o1",)
+    }
+
+    def inout(self):
+        return {
+            "in1": self.o1.in1,
+            "out1": self.o1.out1
+        }
+
+    def connect(self):
+        return (
+            (self.o1.out1, self.o1.in2),
+        )
+
+
+class TestRun(TestCase):
+    def test_settle_ticks(self):
+        d = Display(1)
+        c = NOR(in1=0, in2=0, out1=d.c1)
+        self.assertLess(c.run(settle=True), 100)
+        self.assertEqual(d.res(), 1)
+
+    def test_oscillation(self):
+        with self.assertRaises(CircuitError):
+            Ring().run(settle=True)
+        with self.assertRaises(CircuitError):
+            Ring().run(event=True)
+
+    def test_incremental(self):
+        d = Display(9)
+        inputs = {f"in{i + 1}": 0 for i in range(16)}
+        c = ADD8(**inputs, **{f"out{i + 1}": getattr(d, f"c{i + 1}") for i in range(9)})
+        full = c.run(event=True)
+        self.assertEqual(c.run(event=True), 0)
+        c.set_inputs(in8=1)
+        self.assertLess(c.run(event=True), full / 4)
+        self.assertEqual(list(d.res()), [1, 0, 0, 0, 0, 0, 0, 0, 0])
+        c.set_inputs(in16=1)
+        c.run(event=True)
+        self.assertEqual(list(d.res()), [0, 1, 0, 0, 0, 0, 0, 0, 0])
+        c.run()
+        c.set_inputs(in1=1)
+        self.assertGreaterEqual(c.run(event=True), len(c.primitives()))
+        self.assertEqual(list(d.res()), [0, 1, 0, 0, 0, 0, 0, 1, 0])
+
+    def test_bad_sink(self):
+        c = NOR(in1=1, in2=0)
+        with self.assertRaises(CircuitError):
+            c.set_inputs(out1=5)
+        with self.assertRaises(CircuitError):
+            NOR(in1=1, out1=5)
+        c.set_inputs(out1=Display(1).c1)
+
+    def test_conflicting_modes(self):
+        c = NOR(in1=1, in2=0)
+        for kwargs in ({"event": True, "settle": True}, {"settle": True, "levelized": True}, {"event": True, "levelized": True}):
+            with self.assertRaises(CircuitError):
+                c.run(**kwargs)
+
+    def test_depth(self):
+        self.assertEqual(NOR.DEPTH, 2)
+        self.assertEqual(XOR.DEPTH, 4)
+        self.assertIsNone(Ring.DEPTH)
+        self.assertEqual(Dead.DEPTH, 2)
+        for inputs in product((0, 1), repeat=3):
+            c = ADD(**{f"in{i + 1}": v for i, v in enumerate(inputs)})
+            self.assertLessEqual(c.run(settle=True, n=100), ADD.DEPTH + 1)
+        for value in (0, 1):
+            self.assertLessEqual(Dead(in1=value).run(settle=True, n=100), Dead.DEPTH + 1)
+            self.assertIsNotNone(Dead(in1=value).run(settle=True))
+
+    def test_levelized_fallback(self):
+        with self.assertRaises(CircuitError):
+            levelize(Latch.netlist())
+        d = Display(1)
+        self.assertIsNone(Latch(in1=1, out1=d.c1).run(levelized=True))
+        self.assertEqual(d.res(), 1)
+        self.assertIsNone(NOR(in1=1, in2=0).run(levelized=True))
+
+    def test_state_views(self):
+        s = NOR.state()
+        s.in1.value = 1
+        self.assertEqual(s.values[s.net("in1")], 1)
+        self.assertEqual(s.run(), 1)
+        self.assertEqual(s.out1.value, 0)
+        with self.assertRaises(CircuitError):
+            s.set_inputs(out2=Display(1).c1)
+        d = Display(1)
+        s = Latch.state(in1=1, out1=d.c1)
+        s.run()
+        s.set_inputs(in1=0)
+        s.run()
+        self.assertEqual(d.res(), 1)
+        s.reset()
+        s.run()
+        self.assertEqual(d.res(), 0)
+        self.assertFalse(hasattr(NOR().in1, "__dict__"))
+        self.assertIs(ADD8.state().topology, ADD8.state().topology)
+
+    def test_reset(self):
+        d = Display(1)
+        c = Latch(in1=1, out1=d.c1)
+        c.run(event=True)
+        c.set_inputs(in1=0)
+        c.run(event=True)
+        self.assertEqual(d.res(), 1)
+        c.reset()
+        c.run(event=True)
+        self.assertEqual(d.res(), 0)
+        with self.assertRaises(CircuitError):
+            c.set_inputs(in9=1)
+
+
+class TestNetlist(TestCase):
+    def test_nor(self):
+        nl = NOR.netlist()
+        self.assertEqual(nl.inputs, [0, 1])
+        self.assertEqual(nl.gates, [("or", 2, (0, 1)), ("not", 3, (2,))])
+        self.assertEqual(nl.outputs, [3])
+
+    def test_bridges(self):
+        self.assertEqual(Bridge.netlist().outputs, Bridge.netlist().inputs)
+        for cls in (XOR, GT8, ADD8):
+            nl = cls.netlist()
+            self.assertEqual({g[0] for g in nl.gates} - {"and", "or", "not", "zero"}, set())
+
+    def test_empty(self):
+        with self.assertRaises(CircuitError):
+            ALU.netlist()
+
+    def test_codegen(self):
+        self.assertEqual(generate(NOR.netlist(), "nor"), (
+            "def nor(n0, n1, mask=1):\n"
+            "    n2 = n0 | n1\n"
+            "    n3 = n2 ^ mask\n"
+            "    return (n3,)\n"
+        ))
+        self.assertEqual(NOR.compile()(0, 0), (1,))
+
+
+class TestOptimize(TestCase):
+    def test_equivalent(self):
+        rows = list(product((0, 1), repeat=16))
+        words = pack(rows)
+        for cls in (ADD8, GT8, LTE8):
+            raw = flatten(cls)
+            nl = optimize(raw)
+            self.assertLess(len(nl), len(raw))
+            self.assertEqual(evaluate_packed(nl, words, len(rows)), evaluate_packed(raw, words, len(rows)))
+
+    def test_constants(self):
+        nl = optimize(Netlist("t", [0], [3], [("zero", 1, ()), ("and", 2, (0, 1)), ("not", 3, (2,))], 4))
+        self.assertEqual(nl.gates, [("zero", 1, ()), ("not", 2, (1,))])
+        self.assertEqual(nl.outputs, [2])
+
+    def test_buffers_and_hashing(self):
+        nl = optimize(Netlist("t", [0, 1], [3, 5], [
+            ("not", 2, (0,)), ("not", 3, (2,)), ("and", 4, (0, 1)), ("and", 5, (1, 0)), ("or", 6, (4, 5))
+        ], 7))
+        self.assertEqual(nl.outputs, [0, 2])
+        self.assertEqual(nl.gates, [("and", 2, (0, 1))])
+
+
+class TestAIG(TestCase):
+    def test_hashing(self):
+        g = AIG("t", 3)
+        a, b, c = g.inputs
+        self.assertEqual(g.and_(a, b), g.and_(b, a))
+        self.assertEqual(g.and_(a, a ^ 1), FALSE)
+        self.assertEqual(g.and_(a, g.and_(a, b)), g.and_(a, b))
+        self.assertEqual(g.and_(a, g.and_(a ^ 1, c)), FALSE)
+        self.assertEqual(g.and_(a, g.and_(a ^ 1, c) ^ 1), a)
+        self.assertEqual(len(g), 2)
+
+    def test_balance(self):
+        g = AIG("t", 8)
+        x = g.inputs[0]
+        for i in g.inputs[1:]:
+            x = g.and_(x, i)
+        g.outputs = [x]
+        self.assertEqual(g.depth(), 7)
+        b = g.balance()
+        self.assertEqual(b.depth(), 3)
+        self.assertEqual(len(b), 7)
+
+    def test_equivalent(self):
+        rows = list(product((0, 1), repeat=16))
+        words = pack(rows)
+        for cls in (ADD8, GT8):
+            nl = cls.aig().to_netlist()
+            self.assertEqual({g[0] for g in nl.gates} - {"and", "not", "zero"}, set())
+            self.assertEqual(evaluate_packed(nl, words, len(rows)), evaluate_packed(cls.netlist(), words, len(rows)))
+
+
+class TestCompute(TestCase):
+    def test_bytes(self):
+        self.assertEqual(NOT8.compute(0b10100000), 0b01011111)
+        self.assertEqual(OR8.compute(0b11000000, 0b00000011), 0b11000011)
+        self.assertEqual(AND8.compute(0b11110000, 0b00111100), 0b00110000)
+        self.assertEqual(ADD8.add(200, 100), 300)
+
+    def test_exhaustive(self):
+        checks = {
+            EQ8: lambda a, b: a == b,
+            NEQ8: lambda a, b: a != b,
+            GT8: lambda a, b: a > b,
+            LT8: lambda a, b: a < b,
+            GTE8: lambda a, b: a >= b,
+            LTE8: lambda a, b: a <= b,
+            ADD8: lambda a, b: a + b,
+        }
+        for cls, f in checks.items():
+            for a, b in product(range(256), repeat=2):
+                self.assertEqual(cls.compute(a, b), int(f(a, b)), (cls.__name__, a, b))
+
+    def test_errors(self):
+        with self.assertRaises(CircuitError):
+            ADD8.add(256, 0)
+        with self.assertRaises(CircuitError):
+            ADD8.add(-1, 0)
+        with self.assertRaises(CircuitError):
+            NOT8.compute(1, 2)
+        with self.assertRaises(CircuitError):
+            ALU.compute(12, 1, 2)
+        with self.assertRaises(CircuitError):
+            ALU.compute(9, 1, 2)
+        with self.assertRaises(CircuitError):
+            XOR.compute()
+        with self.assertRaises(CircuitError):
+            XOR.compute(1, 0)
+        self.assertEqual(ALU.weights(9, 1, 2), LSB9)
+        with self.assertRaises(CircuitError):
+            ALU.weights(10)
+
+
+class TestDisplay(TestCase):
+    def test_buffer(self):
+        d = Display(3)
+        d.c1.value = True
+        d.c3.value = 1
+        self.assertIs(d.res(), d.res())
+        self.assertEqual(bytes(d.res()), b"\x01\x00\x01")
+        self.assertEqual(d.packed(), 0b101)
+        self.assertTrue(d.check([1, 0, 1]))
+        self.assertTrue(d.check([True, False, True]))
+        self.assertTrue(d.check(0b101))
+        self.assertFalse(d.check(b"\x01\x01\x01"))
+        self.assertEqual(str(d), "1 0 1")
+
+    def test_batch(self):
+        d = Display(1, 4)
+        for row, inputs in enumerate(product((0, 1), repeat=2)):
+            NOR(in1=inputs[0], in2=inputs[1], out1=d.cells(row)[0]).run()
+        self.assertEqual(d.check_batch(b"\x01\x00\x00\x00"), [])
+        self.assertEqual(d.check_batch(b"\x01\x00\x01\x00"), [2])
+
+
+class TestStream(TestCase):
+    def test_text(self):
+        rows = list(product((0, 1), repeat=3))
+        src = io.BytesIO(b"".join(bytes(48 + b for b in r) + b"\n" for r in rows) + b"\n")
+        dst = io.BytesIO()
+        self.assertEqual(stream(ADD, src, dst, chunk=3), 8)
+        expected = [TestADD.F(*r) for r in rows]
+        self.assertEqual(dst.getvalue().split(), [bytes(48 + int(b) for b in e) for e in expected])
+
+    def test_binary(self):
+        src = io.BytesIO(bytes([1, 1, 255, 1, 200, 100]))
+        dst = io.BytesIO()
+        self.assertEqual(stream(ADD8, src, dst, fmt="binary", chunk=2), 3)
+        res = dst.getvalue()
+        sums = [int(f"{int.from_bytes(res[i:i + 2], 'big'):09b}"[::-1], 2) for i in range(0, 6, 2)]
+        self.assertEqual(sums, [2, 256, 300])
+
+    def test_errors(self):
+        with self.assertRaises(CircuitError):
+            stream(ADD8, io.BytesIO(b"0101\n"), io.BytesIO())
+        with self.assertRaises(CircuitError):
+            stream(ADD8, io.BytesIO(b"\x01"), io.BytesIO(), fmt="binary")
+        with self.assertRaises(CircuitError):
+            stream(ADD, io.BytesIO(b"0a1b1\n"), io.BytesIO())
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            stream_main(["ADD", "--input", os.path.join(tempfile.gettempdir(), "missing", "vectors")])
+
+
+class TestGolden(TestCase):
+    def test_roundtrip(self):
+        vectors = list(product((0, 1), repeat=3))
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "add.gold")
+            with open(path, "wb") as f:
+                self.assertEqual(record(ADD, f, vectors, chunk=3), 8)
+            with Golden(path) as g:
+                self.assertEqual((g.name, g.inputs, g.outputs, len(g)), ("ADD", 3, 2, 8))
+                self.assertEqual(g[5], ((1, 0, 1), tuple(TestADD.F(1, 0, 1))))
+                self.assertEqual(g.replay(chunk=3), (0, []))
+
+    def test_mismatch(self):
+        pairs = [((a, b), (int(a == b),)) for a, b in product((0, 1), repeat=2)]
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "xor.gold")
+            with open(path, "wb") as f:
+                write_golden(f, "XOR", 2, 1, pairs)
+            with Golden(path) as g:
+                self.assertEqual(g.replay(limit=3), (4, [0, 1, 2]))
+                with self.assertRaises(CircuitError):
+                    g.replay(ADD8)
+            out = io.StringIO()
+            with redirect_stdout(out):
+                self.assertEqual(golden_main(["replay", path, "--limit", "1"]), 1)
+            self.assertIn("4 vectors, 4 mismatches", out.getvalue())
+            self.assertEqual(out.getvalue().count("#"), 1)
+
+    def test_errors(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "bad.gold")
+            for data in (b"", b"x" * 10, b"x" * 64):
+                with open(path, "wb") as f:
+                    f.write(data)
+                with self.assertRaises(CircuitError):
+                    Golden(path)
+            with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                golden_main(["replay", path])
+            with open(path, "wb") as f:
+                with self.assertRaises(CircuitError):
+                    write_golden(f, "XOR", 2, 1, [((0,), (0,))])
+
+
+class OpADD(ADD):
+    OPERANDS = (1, 1, 1)
+    RESULT = {0: (2, 1), 1: (1, 2)}
+
+    @classmethod
+    def weights(cls, op, *operands):
+        if op not in cls.RESULT:
+            raise CircuitError("Bad operation")
+        return cls.RESULT[op]
+
+
+class TestLUT(TestCase):
+    def test_build(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "add.lut")
+            with open(path, "wb") as f:
+                self.assertEqual(build_lut(ADD, f, chunk=2), 8)
+            with LUT(path) as lut:
+                self.assertEqual((lut.name, lut.inputs, lut.outputs, len(lut)), ("ADD", 3, 2, 8))
+                for row in product((0, 1), repeat=3):
+                    self.assertEqual(list(lut.lookup(*row)), [int(b) for b in TestADD.F(*row)])
+                with self.assertRaises(CircuitError):
+                    lut.compute(1, 2)
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as d:
+            stale = os.path.join(d, "ADD8-0000000000000000.lut")
+            open(stale, "wb").close()
+            with load_lut(ADD8, d) as lut:
+                self.assertFalse(os.path.exists(stale))
+                for a, b in ((0, 0), (1, 255), (200, 100), (255, 255)):
+                    self.assertEqual(lut.compute(a, b), a + b)
+                with self.assertRaises(CircuitError):
+                    lut.compute(256, 0)
+            name, = os.listdir(d)
+            path = os.path.join(d, name)
+            with open(path, "r+b") as f:
+                f.seek(40)
+                f.write(b"0" * 64)
+            with load_lut(ADD8, d) as lut:
+                self.assertEqual(lut.hash, lut_digest(ADD8))
+                self.assertNotEqual(lut.hash, structural_hash(ADD8))
+                self.assertEqual(lut.compute(7, 9), 16)
+            with load_lut(GT8, d) as lut:
+                self.assertEqual([lut.compute(3, 2), lut.compute(2, 3)], [1, 0])
+            with load_lut(OpADD, d) as lut:
+                self.assertEqual([lut.compute(0, 1, 1), lut.compute(1, 1, 1)], [1, 3])
+                with self.assertRaises(CircuitError):
+                    lut.compute(2, 0, 0)
+            path = os.path.join(d, "empty.lut")
+            open(path, "wb").close()
+            with self.assertRaises(CircuitError):
+                LUT(path)
+
+
+class TestMemo(TestCase):
+    def test_hits(self):
+        d = Display(9)
+        c = ADD8(**{f"out{i + 1}": getattr(d, f"c{i + 1}") for i in range(9)})
+        self.assertIsNone(c.memo_info())
+        c.memoize(size=2)
+        for a, b in ((1, 2), (3, 4), (1, 2), (5, 6), (1, 2), (3, 4)):
+            c.set_inputs(**{f"in{i + 1}": v for i, v in enumerate(ADD8.bits(a, b))})
+            c.run()
+            self.assertEqual(d.packed(), int(f"{a + b:09b}"[::-1], 2))
+        self.assertEqual(c.memo_info(), {"hits": 2, "misses": 4, "evictions": 2, "size": 2, "maxsize": 2})
+        c.memoize(0)
+        self.assertIsNone(c.memo_info())
+
+    def test_skips_simulation(self):
+        c = EQ8(**{f"in{i + 1}": 1 for i in range(16)})
+        c.memoize()
+        c.run()
+        with Profiler(c) as p:
+            self.assertIsNone(c.run())
+            self.assertEqual(c.run(settle=True), 0)
+            self.assertEqual(c.run(event=True), 0)
+        self.assertEqual(p.by_path(), {})
+        self.assertEqual(c.out1.value, 1)
+        self.assertEqual(c.memo_info()["hits"], 3)
+        with self.assertRaises(CircuitError):
+            c.memoize(-1)
+
+    def test_cyclic(self):
+        with self.assertRaises(CircuitError):
+            Ring().memoize()
+
+
+class XORSwapped(XOR):
+    def inout(self):
+        return {
+            "in1": self.b2.in1,
+            "in2": self.b1.in1,
+            "out1": self.o1.out1
+        }
+
+
+class TestCache(TestCase):
+    def test_hash(self):
+        self.assertEqual(structural_hash(GT8), structural_hash(GT8))
+        self.assertNotEqual(structural_hash(GT8), structural_hash(LT8))
+        self.assertNotEqual(structural_hash(XOR), structural_hash(XORSwapped))
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as d:
+            nl = load_netlist(ADD8, d)
+            self.assertEqual(len(os.listdir(d)), 1)
+            cached = load_netlist(ADD8, d)
+            self.assertEqual(cached.gates, nl.gates)
+            self.assertEqual(cached.ordered(), nl.ordered())
+
+    def test_format(self):
+        with tempfile.TemporaryDirectory() as d:
+            stale = os.path.join(d, "ADD8-0000000000000000.netlist")
+            other = os.path.join(d, "ADD-0000000000000000.netlist")
+            for path in (stale, other):
+                open(path, "w").close()
+            nl = load_netlist(ADD8, d)
+            self.assertFalse(os.path.exists(stale))
+            self.assertTrue(os.path.exists(other))
+            name = f"ADD8-{structural_hash(ADD8)[:16]}.netlist"
+            with open(os.path.join(d, name)) as f:
+                self.assertEqual(json.load(f)["size"], nl.size)
+
+    def test_corrupt(self):
+        with tempfile.TemporaryDirectory() as d:
+            nl = load_netlist(ADD8, d)
+            name, = os.listdir(d)
+            for data in (b"", b"garbage", b"cno_such_module\nThing\n."):
+                with open(os.path.join(d, name), "wb") as f:
+                    f.write(data)
+                self.assertEqual(load_netlist(ADD8, d).gates, nl.gates)
+
+
+class TestProfiler(TestCase):
+    def test_counts(self):
+        c = NOR(in1=1, in2=0)
+        update = Circuit.update
+        with Profiler(c) as p:
+            c.run(n=3)
+        self.assertIs(Circuit.update, update)
+        paths = p.by_path()
+        self.assertEqual(paths["NOR"]["update"], 3)
+        self.assertEqual(paths["NOR"]["conductor"], 3)
+        self.assertEqual(paths["NOR.o1"]["input"], 6)
+        self.assertEqual(p.by_class()["NOT"]["input"], 3)
+        self.assertGreaterEqual(paths["NOR"]["update_s"], paths["NOR.o1"]["update_s"])
+        self.assertIn("NOR.n1", p.table())
+
+    def test_event(self):
+        c = NOR(in1=1, in2=0)
+        with Profiler(c) as p:
+            evaluations = c.run(event=True)
+        self.assertIs(NOT.__dict__["evaluate"], NOT.evaluate)
+        classes = p.by_class()
+        self.assertEqual(classes["NOT"]["evaluate"] + classes["OR"]["evaluate"], evaluations)
+        self.assertGreater(classes["NOR"]["conductor"], 0)
+        self.assertGreater(classes["NOT"]["input"], 0)
+        self.assertEqual(classes["NOR"]["update"], 0)
+
+
+class WrongNOR:
+    CIRCUIT = NOR
+    IN = 2
+
+    @staticmethod
+    def F(a, b):
+        return a or b
+
+
+class TestVerify(TestCase):
+    def test_exhaustive(self):
+        self.assertEqual(verify(TestGT8, workers=2, shard=4096), (1 << 16, 0, []))
+
+    def test_mismatches(self):
+        checked, failed, mismatches = verify(WrongNOR, workers=2, shard=2, limit=3)
+        self.assertEqual((checked, failed), (4, 4))
+        self.assertEqual([m[0] for m in mismatches], [0, 1, 2])
+        self.assertEqual(mismatches[0], (0, (0, 0), [1], [0]))
+
+    def test_empty(self):
+        with self.assertRaises(CircuitError):
+            verify(TestALU)
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from lib.engine import pack, unpack
+from lib.utils import CircuitError
+
+
+def cases():
+    import test
+
+    return {
+        cls.CIRCUIT.__name__: cls for cls in vars(test).values()
+        if isinstance(cls, type) and issubclass(cls, test.BaseTest) and cls.CIRCUIT
+    }
+
+
+def rows(width, start, stop):
+    return [tuple((v >> (width - 1 - j)) & 1 for j in range(width)) for v in range(start, stop)]
+
+
+def check_shard(job):
+    case, start, stop, limit = job
+    f = case.CIRCUIT.compile()
+    vectors = rows(case.IN, start, stop)
+    words = f(*pack(vectors), mask=(1 << len(vectors)) - 1)
+    checked = 0
+    failed = 0
+    mismatches = []
+    for index, (inputs, outputs) in enumerate(zip(vectors, unpack(words, len(vectors)))):
+        expected = case.F(*inputs)
+        if expected is None:
+            continue
+        checked += 1
+        expected = [int(i) for i in (expected if isinstance(expected, list) else [expected])]
+        if outputs != expected:
+            failed += 1
+            if len(mismatches) < limit:
+                mismatches.append((start + index, inputs, outputs, expected))
+    return checked, failed, mismatches
+
+
+def verify(case, workers=None, shard=1 << 14, limit=10):
+    if not case.CIRCUIT.ELEMENTS:
+        raise CircuitError("Empty scheme")
+    case.CIRCUIT.compile()
+    total = 1 << case.IN
+    jobs = [(case, start, min(start + shard, total), limit) for start in range(0, total, shard)]
+    checked = 0
+    failed = 0
+    mismatches = []
+    with Pool(workers) as pool:
+        for n, bad, found in pool.imap_unordered(check_shard, jobs):
+            checked += n
+            failed += bad
+            mismatches.extend(found)
+    mismatches.sort()
+    return checked, failed, mismatches[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exhaustive circuit verification")
+    parser.add_argument("circuits", nargs="*", help="circuit class names, all by default")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shard", type=int, default=1 << 14, help="vectors per job")
+    parser.add_argument("--limit", type=int, default=10, help="mismatches to report")
+    args = parser.parse_args(argv)
+    known = cases()
+    names = args.circuits or list(known)
+    failed = False
+    for name in names:
+        if name not in known:
+            parser.error(f"unknown circuit {name}")
+        start = time.perf_counter()
+        try:
+            checked, bad, mismatches = verify(known[name], args.workers, args.shard, args.limit)
+        except CircuitError as e:
+            print(f"{name}: {e}")
+            failed = True
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {checked} vectors, {bad} mismatches, {elapsed:.2f}s")
+        for index, inputs, outputs, expected in mismatches:
+            print(f"  #{index} input: {inputs}, output: {outputs}, correct: {expected}")
+        failed = failed or bool(bad)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())